@@ -5,19 +5,47 @@ CC_SNAPSHOT_SECONDS = 15
 DEFAULT_EXCEL_TEMPLATE = r'C:\FastEHC Template.xlsx'
 # The name of the Excel sheet where the data goes
 EXCEL_SHEET = 'Data'
+# The number of rows buffered between writes to the full scan data CSV
+FULL_CSV_BATCH_SIZE = 1024
+# The file buffer size in bytes for the full scan data CSV, so each batch of rows reaches the disk in a few large writes
+FULL_CSV_BUFFER_SIZE = 1024 * 1024
+# The number of scans processed between progress bar updates
+PROGRESS_BATCH_SIZE = 256
 
 
 ### Required for core functionality
 import argparse
 import os
 import re
-import ijson
+import sys
+import time
 from datetime import datetime, timedelta
 from dateutil.parser import parse as parse_date
 from collections import defaultdict
+from functools import lru_cache
+from bisect import bisect_left
+from array import array
 import math
 import csv
-import shutil
+import numpy as np
+
+### Prefer the C (yajl2_c) backend for ijson; the pure-Python backend is much slower on large data files
+try:
+    import ijson.backends.yajl2_c as ijson
+except ImportError:
+    import ijson
+    print("Consider installing ijson with the yajl2_c backend for faster parsing: 'pip install --force-reinstall ijson'")
+
+### Faster ISO-8601 parsing for timestamps, if available
+try:
+    from ciso8601 import parse_datetime as parse_iso_datetime
+except ImportError:
+    # Before Python 3.11 fromisoformat rejects a trailing 'Z', so it is replaced with the equivalent UTC offset; dropping it
+    # instead would give naive datetimes that .timestamp() treats as local time
+    def parse_iso_datetime(ts):
+        if ts.endswith('Z'):
+            ts = ts[:-1] + '+00:00'
+        return datetime.fromisoformat(ts)
 
 try:
     from tqdm import tqdm
@@ -27,51 +55,64 @@ except ImportError:
     print("Consider installing tqdm for progress bar: 'pip install tqdm'")
 
 ### For direct integration with Excel workbook
-try:
-    import pandas as pd
-    from openpyxl import load_workbook
-    from openpyxl.utils.exceptions import InvalidFileException
-    from openpyxl.utils import column_index_from_string
-    xl_available = True
-except ImportError:
-    xl_available = False   
+# openpyxl is imported in main only when --excel is used, so CSV-only runs don't pay for loading it
 
 ### For debugging only
 import pprint
 
 
 ### Ingest the data file
+# The field names are read from the @odata.context string at the start of the file and the scans are then streamed,
+# so they never need to be held in memory all at once
 def ingest_file(file_path):
-    print("Reading data file...", end="", flush=True)
-    scans = []
-    tmp_field_names = []
-    with open(file_path, 'rb') as file:
-        # Extract field names from the @odata.context string
-        context = ijson.items(file, '@odata.context')
-        context_str = next(context)
-        pattern = r"#Scans\((.*?)\)"
-        match = re.search(pattern, context_str)
-        if match:
-            fields_str = match.group(1)
-            tmp_field_names = [field.strip() for field in fields_str.split(',')]
-            # Adjust the field names here, using tmp_field_names
-            field_names = [field.replace('(LanguageName', '') if 'ScannedLanguages' in field else field for field in tmp_field_names]
-
-        # Reset file pointer and extract scan items
-        file.seek(0)
-        for scan in ijson.items(file, 'value.item'):
-            scans.append(scan)
-
-    print("completed!")
-    return field_names, scans
+    field_names = []
+    file = open(file_path, 'rb')
+
+    # Extract field names from the @odata.context string; it is the first key, so only the first buffer of the file is read
+    for prefix, event, value in ijson.parse(file):
+        if prefix == '@odata.context':
+            pattern = r"#Scans\((.*?)\)"
+            match = re.search(pattern, value)
+            if match:
+                fields_str = match.group(1)
+                tmp_field_names = [field.strip() for field in fields_str.split(',')]
+                # Adjust the field names here, using tmp_field_names
+                field_names = [field.replace('(LanguageName', '') if 'ScannedLanguages' in field else field for field in tmp_field_names]
+            break
+
+    # Rewind and hand the file itself to ijson.items for the scans; feeding it the events from above instead would route
+    # every event through ijson's Python-level plumbing, which is several times slower than letting the C backend read
+    # the buffered file directly (a memory map of the file was also slower)
+    file.seek(0)
+    return field_names, stream_scans(file)
+
+
+### Yield scan items from the data file; the file is closed once all scans are read
+# Progress is measured in bytes read from the file since the number of scans is unknown until the end
+def stream_scans(file):
+    with file:
+        # Numbers are parsed as floats rather than Decimals, which are far more expensive to create and are not needed
+        scans = ijson.items(file, 'value.item', use_float=True)
+        if tqdm_available:
+            with tqdm(total=os.fstat(file.fileno()).st_size, desc="Processing scans", unit="B", unit_scale=True) as pbar:
+                # The bar is only moved every PROGRESS_BATCH_SIZE scans, and once more at the end
+                for count, scan in enumerate(scans, start=1):
+                    yield scan
+                    if count % PROGRESS_BATCH_SIZE == 0:
+                        pbar.update(file.tell() - pbar.n)
+                pbar.update(file.tell() - pbar.n)
+        else:
+            yield from scans
 
 
-### Calcuate the difference between two timestamps in seconds
-def calculate_time_difference(t1, t2):
-    dt1 = parse_date(t1)
-    dt2 = parse_date(t2)
-    time_diff = (dt2 - dt1).total_seconds()
-    return time_diff
+### Parse a timestamp string; Checkmarx uses ISO-8601 so dateutil is only needed as a fallback for anything unexpected
+# Results are cached because consecutive scans frequently share timestamps (e.g., batch submissions)
+@lru_cache(maxsize=4096)
+def parse_timestamp(ts):
+    try:
+        return parse_iso_datetime(ts)
+    except ValueError:
+        return parse_date(ts)
 
 
 ### Convert time in seconds to hours, minutes, and seconds
@@ -90,15 +131,14 @@ def format_seconds_to_timedelta(seconds):
 ### Output a data structure to the Excel 'Data' sheet starting at the indicated cell (e.g., J4)
 def write_to_excel(data, start_col, start_row):
     try:
-        # Convert start_col from letters to a numerical index
+        # Convert start_col from letters to a numerical index; openpyxl is only imported once Excel output is requested
+        from openpyxl.utils import column_index_from_string
         start_col_index = column_index_from_string(start_col)
         wb_sheet = workbook[EXCEL_SHEET]
         
-        for row_offset, row_data in enumerate(data, start=0):
-            for col_offset, value in enumerate(row_data, start=0):
-                # Calculate actual row and column indices
-                row_idx = start_row + row_offset
-                col_idx = start_col_index + col_offset
+        # Enumerate directly over the actual row and column indices
+        for row_idx, row_data in enumerate(data, start=start_row):
+            for col_idx, value in enumerate(row_data, start=start_col_index):
                 wb_sheet.cell(row=row_idx, column=col_idx, value=value)
     except IOError as e:
         print(f"IOError when writing to Excel file: {e}")
@@ -121,28 +161,35 @@ def write_to_csv(header, data, filename):
         print(f"Unexpected error when creating/writing to the CSV file: {e}")
 
 
-### Write a single complete scan record to the full data csv
-def write_scan_to_full_csv(field_names, scan, writer):
+### Add a single complete scan record to the full data csv
+# Rows are buffered and written in batches of FULL_CSV_BATCH_SIZE; any remaining rows must be written by the caller.
+# languages_index is the position of ScannedLanguages in field_names, or None if the field is not present.
+def write_scan_to_full_csv(field_names, languages_index, scan, rows, writer):
     try:
-        # Build a row by extracting each field from the scan in the order of field_names
-        row = []
-        for field in field_names:
-            if field == 'ScannedLanguages':
-                # Special handling for ScannedLanguages field to convert list of dicts to comma-separated string
-                languages = scan.get(field, [])
-                language_str = ', '.join(lang['LanguageName'] for lang in languages)
-                row.append(language_str)
-            else:
-                # For all other fields, use the value as-is
-                row.append(scan.get(field, ""))
-        # Write the constructed row to the CSV file
-        writer.writerow(row)
+        # Build a row by extracting each field from the scan in the order of field_names; all fields are used as-is...
+        row = [scan.get(field, "") for field in field_names]
+        # ...except for ScannedLanguages, which needs to be converted from a list of dicts to a comma-separated string
+        if languages_index is not None:
+            row[languages_index] = ', '.join(lang['LanguageName'] for lang in scan.get('ScannedLanguages', []))
+        rows.append(row)
+        # Write the buffered rows to the CSV file once the batch is full
+        if len(rows) >= FULL_CSV_BATCH_SIZE:
+            writer.writerows(rows)
+            rows.clear()
     except IOError as e:
         print(f"IOError when writing to file: {e}")
     except Exception as e:
         print(f"Unexpected error when creating/writing to the CSV file: {e}")
 
 
+### Pass scans through unchanged, adding each one to the full data csv on the way
+# Wrapping the scan stream once keeps the full csv check out of the scan processing loop when it is disabled.
+def pass_scans_through_full_csv(field_names, languages_index, scans, rows, writer):
+    for scan in scans:
+        write_scan_to_full_csv(field_names, languages_index, scan, rows, writer)
+        yield scan
+
+
 ### Process the scan data.
 # One single function will be more efficient but start to get messy. Brace youreself.
 def process_scans(scans, full_csv):
@@ -229,7 +276,7 @@ def process_scans(scans, full_csv):
         }
 
     # Languages: Store language metrics (language_name, scan_count, scan_percentage) on a dynamic list of languages
-    scan_languages = {}
+    scan_languages = defaultdict(int)
 
     # Scan Origins: Store origin metrics; this is complicated because of many custom-named origins that need to be grouped
     scan_origins = {
@@ -253,117 +300,99 @@ def process_scans(scans, full_csv):
         'Web Portal': {'printable_name': 'Web Portal', 'scan_count': 0, 'scan_percentage': 0}
     }
 
+    # Origin groups already resolved for each raw origin name; there are few distinct origins, so this avoids repeating
+    # the prefix search for every scan
+    origin_groups = {}
+
     # Scan Presets: Store preset metrics (preset_name, scan_count, scan_percentage) on a dynamic list of presets
-    scan_presets = {}
+    scan_presets = defaultdict(int)
 
     # Scan Times by LOC: Store various times for every scan grouped by LOC (source_pulling_time, queue_time, engine_scan_time, total_scan_time)
-    scan_times_by_loc = {
-        '0-20k': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '20k-50k': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '50k-100k': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '100k-250k': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '250k-500k': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '500k-1M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '1M-2M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '2M-3M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '3M-5M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '5M-7M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '7M-10M': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
-        'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
-        'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0},
-        '10M+': {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
+    # Every bin starts from a copy of the same template
+    loc_bin_template = {'COUNT_yes_scans': 0, 'COUNT_no_scans': 0, 'SUM_total_scan_time': 0, 'SUM_source_pulling_time': 0, 'SUM_queue_time': 0,
         'SUM_engine_scan_time': 0, 'MAX_total_scan_time': 0, 'MAX_source_pulling_time': 0, 'MAX_queue_time': 0, 'MAX_engine_scan_time': 0,
         'AVG_total_scan_time': 0, 'AVG_source_pulling_time': 0, 'AVG_queue_time': 0, 'AVG_engine_scan_time': 0}
-    }
+    loc_bin_keys = ('0-20k', '20k-50k', '50k-100k', '100k-250k', '250k-500k', '500k-1M', '1M-2M', '2M-3M', '3M-5M', '5M-7M', '7M-10M', '10M+')
+    scan_times_by_loc = {bin_key: loc_bin_template.copy() for bin_key in loc_bin_keys}
+
+    # Inclusive upper LOC limits of the bins above, in order; anything larger falls into the last (10M+) bin
+    loc_bin_limits = (20000, 50000, 100000, 250000, 500000, 1000000, 2000000, 3000000, 5000000, 7000000, 10000000)
 
     # Scan Statistics by Date: Store various statistics for every scan grouped by scan date
-    # This will be built dynamically but include the following fields:
-    # COUNT_yes_scans
-    # COUNT_no_scans
-    # COUNT_scans
-    # COUNT_full_scans
-    # COUNT_incremental_scans
-    # SUM_loc
-    # MAX_loc
-    # SUM_failed_loc
-    # MAX_failed_loc
-    # SUM_total_scan_time
-    # SUM_source_pulling_time
-    # SUM_queue_time
-    # SUM_engine_scan_time
-    # MAX_total_scan_time
-    # MAX_source_pulling_time
-    # MAX_queue_time
-    # MAX_engine_scan_time
-    # AVG_total_scan_time
-    # AVG_source_pulling_time
-    # AVG_queue_time
-    # AVG_engine_scan_time
-    # COUNT_high_results
-    # COUNT_medium_results
-    # COUNT_low_results
-    # COUNT_info_results
-    scan_stats_by_date = {}
+    # Every date starts from a copy of this template; the defaultdict creates it on the first scan of the date
+    date_stats_template = {
+        'COUNT_yes_scans': 0,
+        'COUNT_no_scans': 0,
+        'COUNT_scans': 0,
+        'COUNT_full_scans': 0,
+        'COUNT_incremental_scans': 0,
+        'SUM_loc': 0,
+        'MAX_loc': 0,
+        'SUM_failed_loc': 0,
+        'MAX_failed_loc': 0,
+        'SUM_total_scan_time': 0,
+        'SUM_source_pulling_time': 0,
+        'SUM_queue_time': 0,
+        'SUM_engine_scan_time': 0,
+        'MAX_total_scan_time': 0,
+        'MAX_source_pulling_time': 0,
+        'MAX_queue_time': 0,
+        'MAX_engine_scan_time': 0,
+        'AVG_total_scan_time': 0,
+        'AVG_source_pulling_time': 0,
+        'AVG_queue_time': 0,
+        'AVG_engine_scan_time': 0
+    }
+    # While scans are processed this is keyed by the ordinal of the scan date; it is converted to date keys afterwards
+    scan_stats_by_date = defaultdict(date_stats_template.copy)
+
+    # The first and last scan dates as ordinals; converted to dates in aggregate_metrics after processing
+    first_scan_day = datetime.max.toordinal()
+    last_scan_day = datetime.min.toordinal()
 
     # Temporary structure to track unique projects
     temp_pids = set()
 
+    # Day of week counters indexed by date.weekday() (Monday is 0)
+    day_of_week_keys = ('COUNT_mon_scans', 'COUNT_tue_scans', 'COUNT_wed_scans', 'COUNT_thu_scans', 'COUNT_fri_scans', 'COUNT_sat_scans', 'COUNT_sun_scans')
+
     # Variables for concurrency
-    # Event format: (timestamp, change_in_count, event_type)
-    # Snapshot format: (timestamp, active_engines, queue_length)
-    # change_in_count is +1 for starts (entering queue or starting engine) and -1 for ends (leaving queue or engine finishing)
-    # event_type distinguishes between 'queue' and 'engine'
-    cc_events = filtered_cc_events = snapshot_metrics = []
+    # Event timestamps are collected separately for each kind of event (a structure of arrays rather than a list of tuples)
+    # and combined into NumPy arrays once all scans are processed:
+    # queue_start/queue_end are scans entering/leaving the queue; engine_start/engine_end are engines starting/finishing
+    # Typed arrays of doubles hold each timestamp in 8 bytes instead of a separate float object, and NumPy reads them directly
+    cc_queue_start_ts = array('d')
+    cc_queue_end_ts = array('d')
+    cc_engine_start_ts = array('d')
+    cc_engine_end_ts = array('d')
     
     ### Prepare to output CSV of all scan data and create output file, if required
     if full_csv['enabled']:
         try:
             filename = os.path.join(full_csv['output_dir'], f'00-full_scan_data.csv')
-            full_csv_file = open(filename, mode='w', newline='', encoding='utf-8')
+            full_csv_file = open(filename, mode='w', buffering=FULL_CSV_BUFFER_SIZE, newline='', encoding='utf-8')
             full_csv_writer = csv.writer(full_csv_file)
             full_csv_writer.writerow(full_csv['field_names'])
+            full_csv_rows = []
+            full_csv_languages_index = full_csv['field_names'].index('ScannedLanguages') if 'ScannedLanguages' in full_csv['field_names'] else None
         except IOError as e:
             print(f"IOError when writing to file: {e}")
+            full_csv['enabled'] = False
         except Exception as e:
             print(f"Unexpected error when creating/writing to the CSV file: {e}")
+            full_csv['enabled'] = False
+
+    # If required, we want to output to the full scan CSV first so as to include scans with missing fields (such as loc). This will cause a potential
+    # mismatch between record counts but shouldn't impact anything relating to metrics or analysis. This CSV is only used for manual analysis.
+    if full_csv['enabled']:
+        scans = pass_scans_through_full_csv(full_csv['field_names'], full_csv_languages_index, scans, full_csv_rows, full_csv_writer)
 
-    ### Initialize tqdm object; we exclude concurrency processing because it's so fast, even for massive data sets
-    if tqdm_available:
-        pbar = tqdm(total=len(scans), desc="Processing scans")
-    else:
+    ### The tqdm progress bar is driven by stream_scans; we exclude concurrency processing because it's so fast, even for massive data sets
+    if not tqdm_available:
         print("Processing scans...", end="", flush=True)
 
     ### Scan processing loop
     for scan in scans:
-        if tqdm_available:
-            pbar.update(1)
-            pbar.refresh()
-
-        # If required, we want to output to the full scan CSV first so as to include scans with missing fields (such as loc). This will cause a potential
-        # mismatch between record counts but shouldn't impact anything relating to metrics or analysis. This CSV is only used for manual analysis.
-        if full_csv['enabled']:
-            write_scan_to_full_csv(full_csv['field_names'], scan, full_csv_writer)
-
         # If there is no LOC value, we might as well just completely skip the scan.
         # This differs from the current process but ensures that scan counts actually match in various metrics. 
         # We will record the missing scan.
@@ -374,91 +403,115 @@ def process_scans(scans, full_csv):
         else:
             aggregate_metrics['COUNT_scans'] += 1
 
-        scan_date_str = scan.get('ScanRequestedOn', '').split('T')[0]
-        scan_date = datetime.strptime(scan_date_str, '%Y-%m-%d').date()
+        # The scan date is taken from the parsed request timestamp rather than re-parsing the date portion of the string; within
+        # the loop it is kept as an ordinal (days since 0001-01-01), which is cheaper to create, hash, and compare than a date
+        requested_dt = parse_timestamp(scan.get('ScanRequestedOn'))
+        scan_day = requested_dt.toordinal()
 
         ### Populate and update key aggregate metrics; note that averages have to be calculated later and many metrics are addressed later
-        if scan.get('EngineFinishedOn', None) is not None:
+        engine_finished_str = scan.get('EngineFinishedOn', None)
+        if engine_finished_str is not None:
             noscan = False
             aggregate_metrics['COUNT_yes_scans'] += 1
         else:
             noscan = True
             aggregate_metrics['COUNT_no_scans'] += 1
 
-        if scan.get('IsIncremental', None):
+        # Look up the remaining per-scan values once; they are used repeatedly below
+        is_incremental = scan.get('IsIncremental', None)
+        failed_loc = scan.get('FailedLOC', 0) or 0
+        total_results = scan.get('TotalVulnerabilities', 0) or 0
+        critical_results = scan.get('Critical', 0) or 0
+        high_results = scan.get('High', 0) or 0
+        medium_results = scan.get('Medium', 0) or 0
+        low_results = scan.get('Low', 0) or 0
+        info_results = scan.get('Info', 0) or 0
+
+        if is_incremental:
             aggregate_metrics['COUNT_incremental_scans'] += 1
         else:
             aggregate_metrics['COUNT_full_scans'] += 1
 
+        # Maximums are updated with comparisons rather than max() to avoid a function call per metric
         aggregate_metrics['SUM_loc'] += loc
-        aggregate_metrics['SUM_failed_loc'] += scan.get('FailedLOC', 0)
-        aggregate_metrics['MAX_loc_scan'] = max(aggregate_metrics['MAX_loc_scan'], loc)
-        aggregate_metrics['MAX_failed_loc_scan'] = max(aggregate_metrics['MAX_failed_loc_scan'], scan.get('FailedLOC', 0))
-
-        aggregate_metrics['SUM_total_results'] += scan.get('TotalVulnerabilities', 0)
-        aggregate_metrics['SUM_critical_results'] += scan.get('Critical', 0)
-        aggregate_metrics['SUM_high_results'] += scan.get('High', 0)
-        aggregate_metrics['SUM_medium_results'] += scan.get('Medium', 0)
-        aggregate_metrics['SUM_low_results'] += scan.get('Low', 0)
-        aggregate_metrics['SUM_info_results'] += scan.get('Info', 0)
-        aggregate_metrics['MAX_total_results'] = max(aggregate_metrics['MAX_total_results'], scan.get('TotalVulnerabilities', 0))
-        aggregate_metrics['MAX_critical_results'] = max(aggregate_metrics['MAX_critical_results'], scan.get('Critical', 0))
-        aggregate_metrics['MAX_high_results'] = max(aggregate_metrics['MAX_high_results'], scan.get('High', 0))
-        aggregate_metrics['MAX_medium_results'] = max(aggregate_metrics['MAX_medium_results'], scan.get('Medium', 0))
-        aggregate_metrics['MAX_low_results'] = max(aggregate_metrics['MAX_low_results'], scan.get('Low', 0))
-        aggregate_metrics['MAX_info_results'] = max(aggregate_metrics['MAX_info_results'], scan.get('Info', 0))
-        if scan.get('Critical', 0) > 0:
+        aggregate_metrics['SUM_failed_loc'] += failed_loc
+        if loc > aggregate_metrics['MAX_loc_scan']:
+            aggregate_metrics['MAX_loc_scan'] = loc
+        if failed_loc > aggregate_metrics['MAX_failed_loc_scan']:
+            aggregate_metrics['MAX_failed_loc_scan'] = failed_loc
+
+        aggregate_metrics['SUM_total_results'] += total_results
+        aggregate_metrics['SUM_critical_results'] += critical_results
+        aggregate_metrics['SUM_high_results'] += high_results
+        aggregate_metrics['SUM_medium_results'] += medium_results
+        aggregate_metrics['SUM_low_results'] += low_results
+        aggregate_metrics['SUM_info_results'] += info_results
+        if total_results > aggregate_metrics['MAX_total_results']:
+            aggregate_metrics['MAX_total_results'] = total_results
+        if critical_results > aggregate_metrics['MAX_critical_results']:
+            aggregate_metrics['MAX_critical_results'] = critical_results
+        if high_results > aggregate_metrics['MAX_high_results']:
+            aggregate_metrics['MAX_high_results'] = high_results
+        if medium_results > aggregate_metrics['MAX_medium_results']:
+            aggregate_metrics['MAX_medium_results'] = medium_results
+        if low_results > aggregate_metrics['MAX_low_results']:
+            aggregate_metrics['MAX_low_results'] = low_results
+        if info_results > aggregate_metrics['MAX_info_results']:
+            aggregate_metrics['MAX_info_results'] = info_results
+        if critical_results > 0:
             aggregate_metrics['COUNT_critical_results_scans'] += 1
-        if scan.get('High', 0) > 0:
+        if high_results > 0:
             aggregate_metrics['COUNT_high_results_scans'] += 1
-        if scan.get('Medium', 0) > 0:
+        if medium_results > 0:
             aggregate_metrics['COUNT_medium_results_scans'] += 1
-        if scan.get('Low', 0) > 0:
+        if low_results > 0:
             aggregate_metrics['COUNT_low_results_scans'] += 1
-        if scan.get('Info', 0) > 0:
+        if info_results > 0:
             aggregate_metrics['COUNT_info_results_scans'] += 1
-        if scan.get('TotalVulnerabilities', 0) == 0:
+        if total_results == 0:
             aggregate_metrics['COUNT_zero_results_scans'] += 1
 
+        # Parse each timestamp once; the datetimes are reused for both durations and concurrency events
+        queued_dt = parse_timestamp(scan.get('QueuedOn'))
+        engine_started_dt = parse_timestamp(scan.get('EngineStartedOn'))
+        completed_dt = parse_timestamp(scan.get('ScanCompletedOn'))
+        if noscan is False:
+            engine_finished_dt = parse_timestamp(engine_finished_str)
+
         # Update time metrics; deal with negative duration issues that sometimes occur
-        source_pulling_time = max(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('QueuedOn')), 0)
+        source_pulling_time = max((queued_dt - requested_dt).total_seconds(), 0)
         aggregate_metrics['SUM_source_pulling_time'] += source_pulling_time
-        aggregate_metrics['MAX_source_pulling_time'] = max(aggregate_metrics['MAX_source_pulling_time'], source_pulling_time)
+        if source_pulling_time > aggregate_metrics['MAX_source_pulling_time']:
+            aggregate_metrics['MAX_source_pulling_time'] = source_pulling_time
 
-        queue_time = max(calculate_time_difference(scan.get('QueuedOn'),scan.get('EngineStartedOn')), 0)
+        queue_time = max((engine_started_dt - queued_dt).total_seconds(), 0)
         aggregate_metrics['SUM_queue_time'] += queue_time
-        aggregate_metrics['MAX_queue_time'] = max(aggregate_metrics['MAX_queue_time'], queue_time)
+        if queue_time > aggregate_metrics['MAX_queue_time']:
+            aggregate_metrics['MAX_queue_time'] = queue_time
         
         if noscan is False:
-            engine_scan_time = max(calculate_time_difference(scan.get('EngineStartedOn'),scan.get('EngineFinishedOn')), 0)
+            engine_scan_time = max((engine_finished_dt - engine_started_dt).total_seconds(), 0)
             aggregate_metrics['SUM_engine_scan_time'] += engine_scan_time
-            aggregate_metrics['MAX_engine_scan_time'] = max(aggregate_metrics['MAX_engine_scan_time'], calculate_time_difference(scan.get('EngineStartedOn'),scan.get('EngineFinishedOn')))
+            if engine_scan_time > aggregate_metrics['MAX_engine_scan_time']:
+                aggregate_metrics['MAX_engine_scan_time'] = engine_scan_time
         
-        total_scan_time = max(calculate_time_difference(scan.get('ScanRequestedOn'),scan.get('ScanCompletedOn')), 0)
+        total_scan_time = max((completed_dt - requested_dt).total_seconds(), 0)
         aggregate_metrics['SUM_total_scan_time'] += total_scan_time
-        aggregate_metrics['MAX_total_scan_time'] = max(aggregate_metrics['MAX_total_scan_time'], total_scan_time)
+        if total_scan_time > aggregate_metrics['MAX_total_scan_time']:
+            aggregate_metrics['MAX_total_scan_time'] = total_scan_time
 
         # Increment the proper day counters
-        day_of_week = scan_date.strftime('%A')
-        day_key_map = {
-            'Monday': 'COUNT_mon_scans',
-            'Tuesday': 'COUNT_tue_scans',
-            'Wednesday': 'COUNT_wed_scans',
-            'Thursday': 'COUNT_thu_scans',
-            'Friday': 'COUNT_fri_scans',
-            'Saturday': 'COUNT_sat_scans',
-            'Sunday': 'COUNT_sun_scans',
-        }
-        if day_of_week in day_key_map:
-            day_key = day_key_map[day_of_week]
-            aggregate_metrics[day_key] += 1
-        if day_of_week in ['Saturday', 'Sunday']:
+        day_of_week = requested_dt.weekday()
+        aggregate_metrics[day_of_week_keys[day_of_week]] += 1
+        if day_of_week >= 5:
             aggregate_metrics['COUNT_weekend_scans'] += 1
         else:
             aggregate_metrics['COUNT_weekday_scans'] += 1
         
-        aggregate_metrics['first_scan_date'] = min(aggregate_metrics['first_scan_date'], scan_date)
-        aggregate_metrics['last_scan_date'] = max(aggregate_metrics['last_scan_date'], scan_date)
+        if scan_day < first_scan_day:
+            first_scan_day = scan_day
+        if scan_day > last_scan_day:
+            last_scan_day = scan_day
 
         # Increment unique project count; sometimes the Id or Name is empty so create a new key type
         project_id = scan.get('ProjectId', 0)
@@ -472,149 +525,124 @@ def process_scans(scans, full_csv):
         for language in scan.get('ScannedLanguages', []):
             lang_name = language.get('LanguageName')
             if lang_name and lang_name != 'Common':
-                scan_languages[lang_name] = scan_languages.get(lang_name, 0) + 1
+                scan_languages[lang_name] += 1
 
         ### Add scan origin
         origin_key = scan.get('Origin', 'Other')
-        group = next((key for key in scan_origins if origin_key.startswith(key)), 'Other')
+        group = origin_groups.get(origin_key)
+        if group is None:
+            group = next((key for key in scan_origins if origin_key.startswith(key)), 'Other')
+            origin_groups[origin_key] = group
         scan_origins[group]['scan_count'] += 1
 
         ### Add scan preset
         preset_name = scan.get('PresetName')
-        scan_presets[preset_name] = scan_presets.get(preset_name, 0) + 1
-
-        ### Add scan times
-        if loc <= 20000:
-            bin_key = '0-20k'
-        elif loc <= 50000:
-            bin_key = '20k-50k'
-        elif loc <= 100000:
-            bin_key = '50k-100k'
-        elif loc <= 250000:
-            bin_key = '100k-250k'
-        elif loc <= 500000:
-            bin_key = '250k-500k'
-        elif loc <= 1000000:
-            bin_key = '500k-1M'
-        elif loc <= 2000000:
-            bin_key = '1M-2M'
-        elif loc <= 3000000:
-            bin_key = '2M-3M'
-        elif loc <= 5000000:
-            bin_key = '3M-5M'
-        elif loc <= 7000000:
-            bin_key = '5M-7M'
-        elif loc <= 10000000:
-            bin_key = '7M-10M'
-        else:
-            bin_key = '10M+'
-            
-        bin = scan_times_by_loc[bin_key]
+        scan_presets[preset_name] += 1
+
+        ### Add scan times; bisect_left finds the first bin whose limit is >= loc
+        bin = scan_times_by_loc[loc_bin_keys[bisect_left(loc_bin_limits, loc)]]
 
         bin['SUM_source_pulling_time'] += source_pulling_time
         bin['SUM_queue_time'] += queue_time
         bin['SUM_total_scan_time'] += total_scan_time
-        bin['MAX_source_pulling_time'] = max(source_pulling_time, bin['MAX_source_pulling_time'])
-        bin['MAX_queue_time'] = max(queue_time, bin['MAX_queue_time'])
-        bin['MAX_total_scan_time'] = max(total_scan_time, bin['MAX_total_scan_time'])
+        if source_pulling_time > bin['MAX_source_pulling_time']:
+            bin['MAX_source_pulling_time'] = source_pulling_time
+        if queue_time > bin['MAX_queue_time']:
+            bin['MAX_queue_time'] = queue_time
+        if total_scan_time > bin['MAX_total_scan_time']:
+            bin['MAX_total_scan_time'] = total_scan_time
 
         if noscan is False:
             bin['COUNT_yes_scans'] += 1
             bin['SUM_engine_scan_time'] += engine_scan_time
-            bin['MAX_engine_scan_time'] = max(engine_scan_time, bin['MAX_engine_scan_time'])
+            if engine_scan_time > bin['MAX_engine_scan_time']:
+                bin['MAX_engine_scan_time'] = engine_scan_time
         else:
             bin['COUNT_no_scans'] += 1
 
         ### Populate scan statistics by date
-        if scan_date not in scan_stats_by_date:
-            scan_stats_by_date[scan_date] = {
-                'COUNT_yes_scans': 0,
-                'COUNT_no_scans': 0,
-                'COUNT_scans': 0,
-                'COUNT_full_scans': 0,
-                'COUNT_incremental_scans': 0,
-                'SUM_loc': 0,
-                'MAX_loc': 0,
-                'SUM_failed_loc': 0,
-                'MAX_failed_loc': 0,
-                'SUM_total_scan_time': 0,
-                'SUM_source_pulling_time': 0,
-                'SUM_queue_time': 0,
-                'SUM_engine_scan_time': 0,
-                'MAX_total_scan_time': 0,
-                'MAX_source_pulling_time': 0,
-                'MAX_queue_time': 0,
-                'MAX_engine_scan_time': 0,
-                'AVG_total_scan_time': 0,
-                'AVG_source_pulling_time': 0,
-                'AVG_queue_time': 0,
-                'AVG_engine_scan_time': 0
-            }
+        date_stats = scan_stats_by_date[scan_day]
 
         if noscan is False:
-            scan_stats_by_date[scan_date]['COUNT_yes_scans'] += 1
-            scan_stats_by_date[scan_date]['SUM_engine_scan_time'] += engine_scan_time
-            scan_stats_by_date[scan_date]['MAX_engine_scan_time'] = max(engine_scan_time, scan_stats_by_date[scan_date]['MAX_engine_scan_time'])
+            date_stats['COUNT_yes_scans'] += 1
+            date_stats['SUM_engine_scan_time'] += engine_scan_time
+            if engine_scan_time > date_stats['MAX_engine_scan_time']:
+                date_stats['MAX_engine_scan_time'] = engine_scan_time
         else:
-            scan_stats_by_date[scan_date]['COUNT_no_scans'] += 1
+            date_stats['COUNT_no_scans'] += 1
                 
-        if scan.get('IsIncremental', None):
-            scan_stats_by_date[scan_date]['COUNT_incremental_scans'] += 1
+        if is_incremental:
+            date_stats['COUNT_incremental_scans'] += 1
         else:
-            scan_stats_by_date[scan_date]['COUNT_full_scans'] += 1
-
-        scan_stats_by_date[scan_date]['COUNT_scans'] += 1
-        scan_stats_by_date[scan_date]['SUM_loc'] += loc
-        scan_stats_by_date[scan_date]['MAX_loc'] = max(loc, scan_stats_by_date[scan_date]['MAX_loc'])
-        scan_stats_by_date[scan_date]['SUM_failed_loc'] += scan.get('FailedLOC', 0)
-        scan_stats_by_date[scan_date]['MAX_failed_loc'] = max(scan.get('FailedLOC', 0), scan_stats_by_date[scan_date]['MAX_failed_loc'])
-        scan_stats_by_date[scan_date]['SUM_total_scan_time'] += total_scan_time
-        scan_stats_by_date[scan_date]['MAX_total_scan_time'] = max(total_scan_time, scan_stats_by_date[scan_date]['MAX_total_scan_time'])
-        scan_stats_by_date[scan_date]['SUM_source_pulling_time'] += source_pulling_time
-        scan_stats_by_date[scan_date]['MAX_source_pulling_time'] = max(source_pulling_time, scan_stats_by_date[scan_date]['MAX_source_pulling_time'])
-        scan_stats_by_date[scan_date]['SUM_queue_time'] += queue_time
-        scan_stats_by_date[scan_date]['MAX_queue_time'] = max(queue_time, scan_stats_by_date[scan_date]['MAX_queue_time'])
-
-        # Parse timestamps for concurrency queueing and engine events
-        queued_on = parse_date(scan['QueuedOn']).timestamp()
-        engine_started_on = parse_date(scan['EngineStartedOn']).timestamp()
+            date_stats['COUNT_full_scans'] += 1
+
+        date_stats['COUNT_scans'] += 1
+        date_stats['SUM_loc'] += loc
+        if loc > date_stats['MAX_loc']:
+            date_stats['MAX_loc'] = loc
+        date_stats['SUM_failed_loc'] += failed_loc
+        if failed_loc > date_stats['MAX_failed_loc']:
+            date_stats['MAX_failed_loc'] = failed_loc
+        date_stats['SUM_total_scan_time'] += total_scan_time
+        if total_scan_time > date_stats['MAX_total_scan_time']:
+            date_stats['MAX_total_scan_time'] = total_scan_time
+        date_stats['SUM_source_pulling_time'] += source_pulling_time
+        if source_pulling_time > date_stats['MAX_source_pulling_time']:
+            date_stats['MAX_source_pulling_time'] = source_pulling_time
+        date_stats['SUM_queue_time'] += queue_time
+        if queue_time > date_stats['MAX_queue_time']:
+            date_stats['MAX_queue_time'] = queue_time
+
+        # Convert timestamps for concurrency queueing and engine events
+        queued_on = queued_dt.timestamp()
+        engine_started_on = engine_started_dt.timestamp()
         engine_finished_on = None
         optimal_scan_finish = None
 
-        cc_events.append((queued_on, +1, 'queue'))
-        cc_events.append((engine_started_on, -1, 'queue'))
+        cc_queue_start_ts.append(queued_on)
+        cc_queue_end_ts.append(engine_started_on)
 
-        if 'EngineFinishedOn' in scan and scan['EngineFinishedOn'] is not None:
-            engine_finished_on = parse_date(scan['EngineFinishedOn']).timestamp()
+        if noscan is False:
+            engine_finished_on = engine_finished_dt.timestamp()
             engine_scan_duration = engine_finished_on - engine_started_on
             optimal_scan_finish = queued_on + engine_scan_duration  # Calculate based on no queue delay assumption
-            cc_events.append((engine_started_on, +1, 'engine'))
-            cc_events.append((optimal_scan_finish, -1, 'engine'))
+            cc_engine_start_ts.append(engine_started_on)
+            cc_engine_end_ts.append(optimal_scan_finish)
         
     # End of scan processing loop
 
+    # Convert the scan day ordinals back to dates
+    aggregate_metrics['first_scan_date'] = datetime.fromordinal(first_scan_day).date()
+    aggregate_metrics['last_scan_date'] = datetime.fromordinal(last_scan_day).date()
+    scan_stats_by_date = {datetime.fromordinal(scan_day).date(): stats for scan_day, stats in scan_stats_by_date.items()}
+
     ### Calculate metrics that require the full data set
     # Note that some averages are calculated against all scans and some ignore noscans; this matches the prior version of the tool but could be changed
-    aggregate_metrics['total_days'] = (aggregate_metrics['last_scan_date'] - aggregate_metrics['first_scan_date']).days
-    aggregate_metrics['total_weeks'] = math.ceil(aggregate_metrics['total_days'] / 7)
-    aggregate_metrics['total_scan_days'] = len(scan_stats_by_date)
-
-    aggregate_metrics['AVG_loc_scan'] = math.ceil(aggregate_metrics['SUM_loc'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_failed_loc_scan'] = math.ceil(aggregate_metrics['SUM_failed_loc'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_loc_day'] = math.ceil(aggregate_metrics['SUM_loc'] / (aggregate_metrics['total_scan_days']))
+    # Integer averages are rounded up with -(-x // y), which stays in integer math instead of going through a float
+    am = aggregate_metrics
+    count_scans = am['COUNT_scans']
+    count_yes_scans = am['COUNT_yes_scans']
+    am['total_days'] = (am['last_scan_date'] - am['first_scan_date']).days
+    am['total_weeks'] = -(-am['total_days'] // 7)
+    am['total_scan_days'] = len(scan_stats_by_date)
+
+    am['AVG_loc_scan'] = -(-am['SUM_loc'] // count_scans)
+    am['AVG_failed_loc_scan'] = -(-am['SUM_failed_loc'] // count_scans)
+    am['AVG_loc_day'] = -(-am['SUM_loc'] // am['total_scan_days'])
 
     for date, stats in scan_stats_by_date.items():
-        aggregate_metrics['MAX_loc_day'] = max(aggregate_metrics['MAX_loc_day'], stats['SUM_loc'])
+        am['MAX_loc_day'] = max(am['MAX_loc_day'], stats['SUM_loc'])
         
-        if stats['COUNT_scans'] > aggregate_metrics['MAX_scans_day']:
-            aggregate_metrics['MAX_scans_day'] = stats['COUNT_scans']
-            aggregate_metrics['MAX_scan_date'] = date
-
-        if stats['COUNT_yes_scans'] > 0:
-            stats['AVG_total_scan_time'] = stats['SUM_total_scan_time'] / stats['COUNT_yes_scans']
-            stats['AVG_source_pulling_time'] = stats['SUM_source_pulling_time'] / stats['COUNT_yes_scans']
-            stats['AVG_queue_time'] = stats['SUM_queue_time'] / stats['COUNT_yes_scans']
-            stats['AVG_engine_scan_time'] = stats['SUM_engine_scan_time'] / stats['COUNT_yes_scans']
+        if stats['COUNT_scans'] > am['MAX_scans_day']:
+            am['MAX_scans_day'] = stats['COUNT_scans']
+            am['MAX_scan_date'] = date
+
+        yes_scans = stats['COUNT_yes_scans']
+        if yes_scans > 0:
+            stats['AVG_total_scan_time'] = stats['SUM_total_scan_time'] / yes_scans
+            stats['AVG_source_pulling_time'] = stats['SUM_source_pulling_time'] / yes_scans
+            stats['AVG_queue_time'] = stats['SUM_queue_time'] / yes_scans
+            stats['AVG_engine_scan_time'] = stats['SUM_engine_scan_time'] / yes_scans
         else:
             stats['AVG_total_scan_time'] = 0
             stats['AVG_source_pulling_time'] = 0
@@ -622,77 +650,85 @@ def process_scans(scans, full_csv):
             stats['AVG_engine_scan_time'] = 0
 
     for bin_key, bin in scan_times_by_loc.items():
-        if bin['COUNT_yes_scans'] > 0:
-            bin['AVG_source_pulling_time'] = math.ceil(bin['SUM_source_pulling_time'] / (bin['COUNT_yes_scans']))
-            bin['AVG_queue_time'] = math.ceil(bin['SUM_queue_time'] / (bin['COUNT_yes_scans']))
-            bin['AVG_engine_scan_time'] = math.ceil(bin['SUM_engine_scan_time'] / bin['COUNT_yes_scans'])
-            bin['AVG_total_scan_time'] = math.ceil(bin['SUM_total_scan_time'] / bin['COUNT_yes_scans'])
-
-    if aggregate_metrics['COUNT_scans'] > 0:
-        aggregate_metrics['AVG_source_pulling_time'] = math.ceil(aggregate_metrics['SUM_source_pulling_time'] / aggregate_metrics['COUNT_yes_scans'])
-        aggregate_metrics['AVG_queue_time'] = math.ceil(aggregate_metrics['SUM_queue_time'] / aggregate_metrics['COUNT_yes_scans'])
-        aggregate_metrics['AVG_total_scan_time'] = math.ceil(aggregate_metrics['SUM_total_scan_time'] / aggregate_metrics['COUNT_yes_scans'])
-    if aggregate_metrics['COUNT_yes_scans'] > 0:
-        aggregate_metrics['AVG_engine_scan_time'] = math.ceil(aggregate_metrics['SUM_engine_scan_time'] / aggregate_metrics['COUNT_yes_scans'])
-        aggregate_metrics['AVG_total_scan_time'] = math.ceil(aggregate_metrics['SUM_total_scan_time'] / aggregate_metrics['COUNT_yes_scans'])
-
-    aggregate_metrics['AVG_total_results'] = math.ceil(aggregate_metrics['SUM_total_results'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_critical_results'] = round(aggregate_metrics['SUM_critical_results'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_high_results'] = round(aggregate_metrics['SUM_high_results'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_medium_results'] = round(aggregate_metrics['SUM_medium_results'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_low_results'] = round(aggregate_metrics['SUM_low_results'] / aggregate_metrics['COUNT_scans'])
-    aggregate_metrics['AVG_info_results']= round(aggregate_metrics['SUM_info_results'] / aggregate_metrics['COUNT_scans'])
+        yes_scans = bin['COUNT_yes_scans']
+        if yes_scans > 0:
+            bin['AVG_source_pulling_time'] = math.ceil(bin['SUM_source_pulling_time'] / yes_scans)
+            bin['AVG_queue_time'] = math.ceil(bin['SUM_queue_time'] / yes_scans)
+            bin['AVG_engine_scan_time'] = math.ceil(bin['SUM_engine_scan_time'] / yes_scans)
+            bin['AVG_total_scan_time'] = math.ceil(bin['SUM_total_scan_time'] / yes_scans)
+
+    if count_scans > 0:
+        am['AVG_source_pulling_time'] = math.ceil(am['SUM_source_pulling_time'] / count_yes_scans)
+        am['AVG_queue_time'] = math.ceil(am['SUM_queue_time'] / count_yes_scans)
+        am['AVG_total_scan_time'] = math.ceil(am['SUM_total_scan_time'] / count_yes_scans)
+    if count_yes_scans > 0:
+        am['AVG_engine_scan_time'] = math.ceil(am['SUM_engine_scan_time'] / count_yes_scans)
+        am['AVG_total_scan_time'] = math.ceil(am['SUM_total_scan_time'] / count_yes_scans)
+
+    am['AVG_total_results'] = -(-am['SUM_total_results'] // count_scans)
+    am['AVG_critical_results'] = round(am['SUM_critical_results'] / count_scans)
+    am['AVG_high_results'] = round(am['SUM_high_results'] / count_scans)
+    am['AVG_medium_results'] = round(am['SUM_medium_results'] / count_scans)
+    am['AVG_low_results'] = round(am['SUM_low_results'] / count_scans)
+    am['AVG_info_results'] = round(am['SUM_info_results'] / count_scans)
 
     for origin, data in scan_origins.items():
-        data['scan_percentage'] = data['scan_count'] / aggregate_metrics['COUNT_scans']
+        data['scan_percentage'] = data['scan_count'] / count_scans
     
-    if tqdm_available:
-        pbar.close()
-    else:
+    if not tqdm_available:
         print("completed!")
 
     # Process concurrency events
     print(f"Calculating scan concurrency using {CC_SNAPSHOT_SECONDS} second snapshots...", end="", flush=True)
 
-    # Initialize variables
-    cc_window_start_ts = datetime.combine(aggregate_metrics['first_scan_date'], datetime.min.time()).timestamp()
-    cc_window_end_ts = datetime.combine(aggregate_metrics['last_scan_date'], datetime.min.time()).timestamp()
+    # Initialize variables; the window runs from local midnight of the first scan date to local midnight of the last
+    cc_window_start_ts = time.mktime(aggregate_metrics['first_scan_date'].timetuple())
+    cc_window_end_ts = time.mktime(aggregate_metrics['last_scan_date'].timetuple())
     num_snapshots = math.ceil((cc_window_end_ts - cc_window_start_ts) / CC_SNAPSHOT_SECONDS)
 
-    # Filter out objects based on the window and sort them
-    filtered_cc_events = [event for event in cc_events if cc_window_start_ts <= event[0] <= cc_window_end_ts]
-    filtered_cc_events.sort(key=lambda x: x[0])
-
-    current_active_engines = 0
-    current_queue_length = 0
-    event_index = 0
-    snapshot_metrics = []
-    
-    # For each snapshot...
-    for snapshot in range(num_snapshots):
-        # Calculate the bounds of the snapshot in timestamp format
-        snapshot_start_ts = cc_window_start_ts + snapshot * CC_SNAPSHOT_SECONDS
-        next_snapshot_start_ts = snapshot_start_ts + CC_SNAPSHOT_SECONDS
-
-        while event_index < len(filtered_cc_events) and filtered_cc_events[event_index][0] < next_snapshot_start_ts:
-            event_time, change, event_type = filtered_cc_events[event_index]
-            
-            if event_type == 'engine':
-                current_active_engines += change
-            elif event_type == 'queue':
-                current_queue_length += change
-            
-            event_index += 1
-        
-        # Convert snapshot_start_ts to datetime for recording
-        snapshot_start_dt = datetime.fromtimestamp(snapshot_start_ts)
-
-        # Append the metrics for the current snapshot to the list
-        snapshot_metrics.append((snapshot_start_dt, current_active_engines, current_queue_length))
+    # Combine the events into NumPy arrays: the timestamp, the change in count (+1 for starts, -1 for ends), and the event type
+    # (0 for queue events, 1 for engine events)
+    cc_event_ts = np.concatenate([np.frombuffer(cc_queue_start_ts, dtype=np.float64), np.frombuffer(cc_queue_end_ts, dtype=np.float64),
+        np.frombuffer(cc_engine_start_ts, dtype=np.float64), np.frombuffer(cc_engine_end_ts, dtype=np.float64)])
+    cc_event_change = np.concatenate([np.ones(len(cc_queue_start_ts), dtype=np.int8), np.full(len(cc_queue_end_ts), -1, dtype=np.int8),
+        np.ones(len(cc_engine_start_ts), dtype=np.int8), np.full(len(cc_engine_end_ts), -1, dtype=np.int8)])
+    cc_event_type = np.concatenate([np.zeros(len(cc_queue_start_ts) + len(cc_queue_end_ts), dtype=np.uint8),
+        np.ones(len(cc_engine_start_ts) + len(cc_engine_end_ts), dtype=np.uint8)])
+
+    # Filter out events based on the window and sort them by timestamp
+    in_window = (cc_event_ts >= cc_window_start_ts) & (cc_event_ts <= cc_window_end_ts)
+    order = np.argsort(cc_event_ts[in_window], kind='stable')
+    cc_event_ts = cc_event_ts[in_window][order]
+    cc_event_change = cc_event_change[in_window][order]
+    cc_event_type = cc_event_type[in_window][order]
+
+    # Running totals of active engines and queue length after each event, with a leading zero for "no events yet"
+    active_engines_after = np.concatenate(([0], np.cumsum(np.where(cc_event_type == 1, cc_event_change, 0), dtype=np.int64)))
+    queue_length_after = np.concatenate(([0], np.cumsum(np.where(cc_event_type == 0, cc_event_change, 0), dtype=np.int64)))
+
+    # Each snapshot records the totals after every event before the start of the next snapshot; searchsorted finds how
+    # many events that is for all of the snapshots at once
+    snapshot_start_ts = cc_window_start_ts + np.arange(num_snapshots) * CC_SNAPSHOT_SECONDS
+    events_before_next = np.searchsorted(cc_event_ts, snapshot_start_ts + CC_SNAPSHOT_SECONDS, side='left')
+    snapshot_active_engines = active_engines_after[events_before_next]
+    snapshot_queue_length = queue_length_after[events_before_next]
+
+    # The snapshots are kept as arrays; output_analysis reduces them to daily maxima without visiting each snapshot in Python
+    snapshot_metrics = {
+        'snapshot_start_ts': snapshot_start_ts,
+        'active_engines': snapshot_active_engines,
+        'queue_length': snapshot_queue_length
+    }
     print("completed!")
 
-    # Close the CSV file if it's open
+    # Write any remaining buffered rows and close the CSV file if it's open
     if full_csv['enabled']:
+        try:
+            full_csv_writer.writerows(full_csv_rows)
+        except IOError as e:
+            print(f"IOError when writing to file: {e}")
+        except Exception as e:
+            print(f"Unexpected error when creating/writing to the CSV file: {e}")
         full_csv_file.close()
 
     return {
@@ -708,36 +744,44 @@ def process_scans(scans, full_csv):
 
 ### Shell function to handle outputs
 def output_analysis(data, csv_config, excel_config):
-    # Identify daily max concurrency values based on the granular calculations made previously
-    daily_maxima = defaultdict(lambda: {'actual': 0, 'optimal': 0})
-    for snapshot in data['cc_metrics']:
-        snapshot_dt, active_engines, queue_length = snapshot
-        snapshot_date = snapshot_dt.date()
-        optimal_concurrency = active_engines + queue_length
-
-        # Update daily maximums
-        daily_record = daily_maxima[snapshot_date]
-        daily_record['actual'] = max(daily_record['actual'], active_engines)
-        daily_record['optimal'] = max(daily_record['optimal'], optimal_concurrency)
-
-    output_summary_of_scans(data, csv_config, excel_config)
-    output_scan_metrics(data, csv_config, excel_config)
-    output_scan_duration(data, csv_config, excel_config)
-    output_scan_results_and_severity(data, csv_config, excel_config)
-    output_scan_languages(data, csv_config, excel_config)
-    output_scan_submission_summary(data, csv_config, excel_config)
-    output_day_of_week_scan_average(data, csv_config, excel_config)
-    output_scan_origins(data, csv_config, excel_config)
-    output_scan_presets(data, csv_config, excel_config)
-    output_scan_time_analysis(data, csv_config, excel_config)
-    output_scan_concurrency(daily_maxima, csv_config, excel_config)
-    output_scans_by_date(data['scan_stats_by_date'], csv_config, excel_config)
-    output_scans_by_week(data['scan_stats_by_date'], csv_config, excel_config)
-
-
-### Output Functions: Handle all types of output for a specific metric type or report section
-
-def output_summary_of_scans(data, csv_config, excel_config):
+    # The per-date and per-week reports share their columns apart from the first
+    scan_stats_header = ['Scans','No Scans','Full Scans','Incremental Scans','Sum LOC','Max LOC','Sum Failed LOC','Max Failed LOC',
+        'AVG Total Scan Time','Max Total Scan Time','Avg Source Pulling Time','Max Source Pulling Time','Avg Queue Time','Max Queue Time',
+        'Avg Engine Time','Max Engine Time']
+
+    # Every report as (output function, csv filename, csv header, starting column on the Excel sheet)
+    reports = [
+        (output_summary_of_scans, '01-summary_of_scans.csv', ['Description','Value','%'], 'B'),
+        (output_scan_metrics, '02-scan_metrics.csv', ['Description','Average','Max'], 'F'),
+        (output_scan_duration, '03-scan_duration.csv', ['Description','Average','Max'], 'J'),
+        (output_scan_results_and_severity, '03-scan_duration.csv', ['Description','Average','Max'], 'N'),
+        (output_scan_languages, '05-languages.csv', ['Language','%','Scans'], 'R'),
+        (output_scan_submission_summary, '06-scan_submissison_summary.csv', ['Description','Value'], 'V'),
+        (output_day_of_week_scan_average, '07-day_of_week_scan_average.csv', ['Day of Week','Scans','%'], 'Y'),
+        (output_scan_origins, '08-origins.csv', ['Origin','Scans','%'], 'AC'),
+        (output_scan_presets, '09-presets.csv', ['Preset','Scans','%'], 'AG'),
+        (output_scan_time_analysis, '09-presets.csv', ['LOC Range','Scans','% Scans','Avg Total Time','Avg Source Pulling Time','Avg Queue Time',
+            'Avg Engine Scan Time'], 'AK'),
+        (output_scan_concurrency, '11-concurrency_analysis.csv', ['Date','Max Actual','Max Optimal'], 'AS'),
+        (output_scans_by_date, '12-scans_by_date.csv', ['Date'] + scan_stats_header, 'AW'),
+        (output_scans_by_week, '13-scans_by_week.csv', ['Week'] + scan_stats_header, 'BO')
+    ]
+
+    for output_function, csv_filename, csv_header, excel_col in reports:
+        output_data = output_function(data)
+
+        # Create csv, if required
+        if csv_config['enabled']:
+            write_to_csv(csv_header, output_data, os.path.join(csv_config['output_dir'], csv_filename))
+
+        # Output to Excel, if required
+        if excel_config['enabled']:
+            write_to_excel(output_data, excel_col, 4)
+
+
+### Output Functions: Build the rows for a specific metric type or report section; output_analysis writes them out
+
+def output_summary_of_scans(data):
     submitted_scans = data['aggregate_metrics']['COUNT_scans'] + data['aggregate_metrics']['COUNT_missing_scans'];
     # Create the data structure to hold the various fields
     output_data = [
@@ -760,16 +804,10 @@ def output_summary_of_scans(data, csv_config, excel_config):
         ['Unique Projects Scanned',data['aggregate_metrics']['COUNT_projects_scanned']]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Description','Value','%'], output_data, os.path.join(csv_config['output_dir'], f'01-summary_of_scans.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'B', 4)
+    return output_data
 
 
-def output_scan_metrics(data, csv_config, excel_config):
+def output_scan_metrics(data):
     # Create the data structure to hold the various fields
     output_data = [
         ['LOC per Scan',data['aggregate_metrics']['AVG_loc_scan'],data['aggregate_metrics']['MAX_loc_scan']],
@@ -777,16 +815,10 @@ def output_scan_metrics(data, csv_config, excel_config):
         ['Daily LOC',data['aggregate_metrics']['AVG_loc_day'],data['aggregate_metrics']['MAX_loc_day']]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Description','Average','Max'], output_data, os.path.join(csv_config['output_dir'], f'02-scan_metrics.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'F', 4)
+    return output_data
 
 
-def output_scan_duration(data, csv_config, excel_config):
+def output_scan_duration(data):
     # Create the data structure to hold the various fields
     output_data = [
         ['Total Scan Duration',format_seconds_to_timedelta(data['aggregate_metrics']['AVG_total_scan_time']),format_seconds_to_timedelta(data['aggregate_metrics']['MAX_total_scan_time'])],
@@ -795,16 +827,10 @@ def output_scan_duration(data, csv_config, excel_config):
         ['Engine Scan Duration',format_seconds_to_timedelta(data['aggregate_metrics']['AVG_engine_scan_time']),format_seconds_to_timedelta(data['aggregate_metrics']['MAX_engine_scan_time'])]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Description','Average','Max'], output_data, os.path.join(csv_config['output_dir'], f'03-scan_duration.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'J', 4)
+    return output_data
 
 
-def output_scan_results_and_severity(data, csv_config, excel_config):
+def output_scan_results_and_severity(data):
     # Create the data structure to hold the various fields
     output_data = [
         ['Total',data['aggregate_metrics']['AVG_total_results'],data['aggregate_metrics']['MAX_total_results']],
@@ -815,31 +841,18 @@ def output_scan_results_and_severity(data, csv_config, excel_config):
         ['Informational',data['aggregate_metrics']['AVG_info_results'],data['aggregate_metrics']['MAX_info_results']]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Description','Average','Max'], output_data, os.path.join(csv_config['output_dir'], f'03-scan_duration.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'N', 4)
+    return output_data
 
 
-def output_scan_languages(data, csv_config, excel_config):
+def output_scan_languages(data):
     # Create the data structure to hold the various fields
-    output_data = []
-    for language, count in data['scan_languages'].items():
-        output_data.append([language, count / data['aggregate_metrics']['COUNT_scans'], count])
+    count_scans = data['aggregate_metrics']['COUNT_scans']
+    output_data = [[language, count / count_scans, count] for language, count in data['scan_languages'].items()]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Language','%','Scans'], output_data, os.path.join(csv_config['output_dir'], f'05-languages.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'R', 4)
+    return output_data
 
 
-def output_scan_submission_summary(data, csv_config, excel_config):
+def output_scan_submission_summary(data):
     # Create the data structure to hold the various fields
     output_data = [
         ['Average Scans Submitted per Week',data['aggregate_metrics']['COUNT_scans'] / data['aggregate_metrics']['total_weeks']],
@@ -850,15 +863,9 @@ def output_scan_submission_summary(data, csv_config, excel_config):
         ['Date of Max Daily Scans',data['aggregate_metrics']['MAX_scan_date']]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Description','Value'], output_data, os.path.join(csv_config['output_dir'], f'06-scan_submissison_summary.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'V', 4)
+    return output_data
 
-def output_day_of_week_scan_average(data, csv_config, excel_config):
+def output_day_of_week_scan_average(data):
     # Create the data structure to hold the various fields
     output_data = [
         ['Monday',data['aggregate_metrics']['COUNT_mon_scans'], data['aggregate_metrics']['COUNT_mon_scans'] / data['aggregate_metrics']['COUNT_scans']],
@@ -870,75 +877,62 @@ def output_day_of_week_scan_average(data, csv_config, excel_config):
         ['Sunday',data['aggregate_metrics']['COUNT_sun_scans'], data['aggregate_metrics']['COUNT_sun_scans'] / data['aggregate_metrics']['COUNT_scans']]
     ]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Day of Week','Scans','%'], output_data, os.path.join(csv_config['output_dir'], f'07-day_of_week_scan_average.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'Y', 4)
+    return output_data
 
-def output_scan_origins(data, csv_config, excel_config):
+def output_scan_origins(data):
     # Create the data structure to hold the various fields
     output_data = []
     for key, value in data['scan_origins'].items():
         if value['scan_count'] > 0:
             output_data.append([value['printable_name'], value['scan_count'], value['scan_percentage']])
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Origin','Scans','%'], output_data, os.path.join(csv_config['output_dir'], f'08-origins.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'AC', 4)
+    return output_data
 
-def output_scan_presets(data, csv_config, excel_config):
+def output_scan_presets(data):
     # Create the data structure to hold the various fields
-    output_data = []
-    for preset, count in data['scan_presets'].items():
-        output_data.append([preset, count, count / data['aggregate_metrics']['COUNT_scans']])
+    count_scans = data['aggregate_metrics']['COUNT_scans']
+    output_data = [[preset, count, count / count_scans] for preset, count in data['scan_presets'].items()]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Preset','Scans','%'], output_data, os.path.join(csv_config['output_dir'], f'09-presets.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'AG', 4)
+    return output_data
 
-def output_scan_time_analysis(data, csv_config, excel_config):
+def output_scan_time_analysis(data):
     # Create the data structure to hold the various fields
     output_data = []
+    count_scans = data['aggregate_metrics']['COUNT_scans']
     for key, value in data['scan_times_by_loc'].items():
-        output_data.append([key, value['COUNT_yes_scans'] + value['COUNT_no_scans'], (value['COUNT_yes_scans'] + value['COUNT_no_scans']) / data['aggregate_metrics']['COUNT_scans'],
+        bin_scans = value['COUNT_yes_scans'] + value['COUNT_no_scans']
+        output_data.append([key, bin_scans, bin_scans / count_scans,
             format_seconds_to_timedelta(value['AVG_total_scan_time']), format_seconds_to_timedelta(value['AVG_source_pulling_time']),
             format_seconds_to_timedelta(value['AVG_queue_time']), format_seconds_to_timedelta(value['AVG_engine_scan_time'])])
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['LOC Range','Scans','% Scans','Avg Total Time','Avg Source Pulling Time','Avg Queue Time','Avg Engine Scan Time'], output_data, os.path.join(csv_config['output_dir'], f'09-presets.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'AK', 4)
+    return output_data
 
-def output_scan_concurrency(daily_maxima, csv_config, excel_config):
-    # Create the data structure to hold the various fields
+def output_scan_concurrency(data):
+    # Identify daily max concurrency values based on the granular calculations made previously
+    # Snapshots are in time order, so each day is the run of snapshots starting at the first one on or after its local midnight
+    cc_metrics = data['cc_metrics']
+    first_scan_date = data['aggregate_metrics']['first_scan_date']
+    days = [first_scan_date + timedelta(days=n) for n in range(data['aggregate_metrics']['total_days'] + 1)]
+    day_starts = np.searchsorted(cc_metrics['snapshot_start_ts'], [time.mktime(day.timetuple()) for day in days], side='left')
+
+    # Skip days without any snapshots (the last scan date is outside the concurrency window)
+    has_snapshots = day_starts < np.append(day_starts[1:], len(cc_metrics['snapshot_start_ts']))
+    days = [day for day, keep in zip(days, has_snapshots) if keep]
+    day_starts = day_starts[has_snapshots]
+
+    # Create the data structure to hold the various fields; the days are already in date order, so no sort is needed
+    # Maximums are taken per run of snapshots, and never go below zero
     output_data = []
-    for date, maxima in sorted(daily_maxima.items()):
-        output_data.append([date, maxima['actual'], maxima['optimal']])
+    if len(day_starts) > 0:
+        daily_actual = np.maximum(np.maximum.reduceat(cc_metrics['active_engines'], day_starts), 0)
+        daily_optimal = np.maximum(np.maximum.reduceat(cc_metrics['active_engines'] + cc_metrics['queue_length'], day_starts), 0)
+        output_data = [[day, actual, optimal] for day, actual, optimal in zip(days, daily_actual.tolist(), daily_optimal.tolist())]
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Date','Max Actual','Max Optimal'], output_data, os.path.join(csv_config['output_dir'], f'11-concurrency_analysis.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'AS', 4)
+    return output_data
 
 
-def output_scans_by_date(scan_stats_by_date, csv_config, excel_config):
+def output_scans_by_date(data):
+    scan_stats_by_date = data['scan_stats_by_date']
     # Create the data structure to hold the various fields
     output_data = []
     for date, value in scan_stats_by_date.items():
@@ -949,36 +943,34 @@ def output_scans_by_date(scan_stats_by_date, csv_config, excel_config):
             format_seconds_to_timedelta(value['AVG_queue_time']),format_seconds_to_timedelta(value['MAX_queue_time']),
             format_seconds_to_timedelta(value['AVG_engine_scan_time']),format_seconds_to_timedelta(value['MAX_engine_scan_time'])])
         
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Date','Scans','No Scans','Full Scans','Incremental Scans','Sum LOC','Max LOC','Sum Failed LOC','Max Failed LOC',
-            'AVG Total Scan Time','Max Total Scan Time','Avg Source Pulling Time','Max Source Pulling Time','Avg Queue Time','Max Queue Time',
-            'Avg Engine Time','Max Engine Time'], output_data, os.path.join(csv_config['output_dir'], f'12-scans_by_date.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'AW', 4)
+    return output_data
 
 
-def output_scans_by_week(scan_stats_by_date, csv_config, excel_config):
+def output_scans_by_week(data):
+    scan_stats_by_date = data['scan_stats_by_date']
     # Convert daily data to weekly data
     weekly_data = {}
 
+    # Every date has the same fields, so sort them into summed and maximum fields once rather than for every date
+    date_fields = next(iter(scan_stats_by_date.values()), {})
+    sum_keys = [key for key in date_fields if 'COUNT' in key or 'SUM' in key]
+    max_keys = [key for key in date_fields if 'MAX' in key and key not in sum_keys]
+
     for date, value in scan_stats_by_date.items():
         # Calculate the Monday of the current week
         monday_of_week = date - timedelta(days=date.weekday())
         
         # Initialize or update the weekly data
-        if monday_of_week not in weekly_data:
-            weekly_data[monday_of_week] = value.copy()
-            weekly_data[monday_of_week]['days_counted'] = 1
+        week_data = weekly_data.get(monday_of_week)
+        if week_data is None:
+            week_data = weekly_data[monday_of_week] = value.copy()
+            week_data['days_counted'] = 1
         else:
-            week_data = weekly_data[monday_of_week]
-            for key in value:
-                if 'COUNT' in key or 'SUM' in key:
-                    week_data[key] += value[key]
-                elif 'MAX' in key:
-                    week_data[key] = max(week_data[key], value[key])
+            for key in sum_keys:
+                week_data[key] += value[key]
+            for key in max_keys:
+                if value[key] > week_data[key]:
+                    week_data[key] = value[key]
             week_data['days_counted'] += 1
 
     # Prepare the data for output
@@ -1011,19 +1003,14 @@ def output_scans_by_week(scan_stats_by_date, csv_config, excel_config):
         ]
         output_data.append(row)
 
-    # Create csv, if required
-    if csv_config['enabled']:
-        write_to_csv(['Week','Scans','No Scans','Full Scans','Incremental Scans','Sum LOC','Max LOC','Sum Failed LOC','Max Failed LOC',
-            'AVG Total Scan Time','Max Total Scan Time','Avg Source Pulling Time','Max Source Pulling Time','Avg Queue Time','Max Queue Time',
-            'Avg Engine Time','Max Engine Time'], output_data, os.path.join(csv_config['output_dir'], f'13-scans_by_week.csv'))
-    
-    # Output to Excel, if required
-    if excel_config['enabled']:
-        write_to_excel(output_data, 'BO', 4)
+    return output_data
 
 
 ### Main
-if __name__ == "__main__":
+def main():
+    # The snapshot size can be overridden on the command line, and write_to_excel writes to the workbook opened here
+    global CC_SNAPSHOT_SECONDS, workbook
+
     parser = argparse.ArgumentParser(description="Process scans and output CSV files if requested")
     parser.add_argument("input_file", type=str, help="JSON file containing scan data")
     parser.add_argument("--customer", type=str, default="", help="Optional name of the customer")
@@ -1037,7 +1024,6 @@ if __name__ == "__main__":
     # Make sure that some sort of output is defined
     if not (args.csv or args.full_data or args.excel):
         parser.error("At least one of the output options --csv, --full_data, or --excel must be specified.")
-        exit(1)
 
     input_file = args.input_file
     output_name = args.customer.replace(" ", "_") if args.customer else os.path.splitext(os.path.basename(input_file))[0]
@@ -1050,16 +1036,11 @@ if __name__ == "__main__":
         parser.error("No Excel template file is defined. Either provide a default in the script or define as '--excel=template_file.xlsx'")
 
     # Define the output directory using the optional name if provided
-    start_time = datetime.now().strftime('%Y%m%d-%H%M%S')
-    output_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{start_time}")
+    start_time = datetime.now()
+    output_dir = os.path.join(os.getcwd(), f"ehc_output_{output_name}_{start_time.strftime('%Y%m%d-%H%M%S')}")
 
-    # Define the target Excel workbook filename
-    if args.excel:
-        excel_filename = f"EHC-{output_name}.xlsx"
-        excel_target_full_path = os.path.join(output_dir, excel_filename)
-    else:
-        excel_filename = None
-        excel_target_full_path = None
+    # Define the target Excel workbook path
+    excel_target_full_path = os.path.join(output_dir, f"EHC-{output_name}.xlsx") if args.excel else None
 
     # Initialize structures to hold output configs
     full_csv = {
@@ -1083,43 +1064,33 @@ if __name__ == "__main__":
             os.makedirs(output_dir, exist_ok=True)
         except PermissionError as e:
             print(f"Permission Error: {e}")
-            exit(1)
+            return 1
         except Exception as e:
             print(f"Error creating directory: {e}")
-            exit(1)
+            return 1
 
     # If we're exporting to Excel...
     if excel_config['enabled']:
-        # Make sure we have the required libraries
-        if not  xl_available:
-            parser.error("--excel requires pandas and openpyxl libraries: 'pip install pandas openpyxl'")
+        # Make sure we have the required library
+        try:
+            from openpyxl import load_workbook
+            from openpyxl.utils.exceptions import InvalidFileException
+        except ImportError:
+            parser.error("--excel requires the openpyxl library: 'pip install openpyxl'")
         # Make sure the template file exists
         if not os.path.isfile(excel_template):
             print(f"Error: The file '{excel_template}' does not exist.")
-            exit(1)
-        # Open the template workbook to validate that it is an Excel file
+            return 1
+        # Open the template workbook, which also validates that it is an Excel file; it is only loaded once and the
+        # target Excel workbook is created when it is saved at the end, so there is no need to copy the template first
         try:
             workbook = load_workbook(excel_template)
         except InvalidFileException:
             print(f"Error: The file '{excel_template}' is not a valid Excel file or is corrupted.")
-            exit(1)
+            return 1
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            exit(1)
-        # Copy the template in order to create the target Excel workbook
-        try:
-            shutil.copy(excel_template, excel_target_full_path)
-        except Exception as e:
-            print(f"Error occurred: {e}")
-        # Open the new Excel workbook
-        try:
-            workbook = load_workbook(excel_target_full_path)
-        except InvalidFileException:
-            print(f"Error: The file '{excel_filename}' is not a valid Excel file or is corrupted.")
-            exit(1)
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            exit(1)
+            return 1
 
     full_csv['field_names'], scans = ingest_file(input_file)
 
@@ -1131,7 +1102,13 @@ if __name__ == "__main__":
     if(excel_config['enabled']):
         workbook.save(excel_target_full_path)
 
-    end_time = datetime.now().strftime('%Y%m%d-%H%M%S')
-    elapsed_time = format_seconds_to_hms(calculate_time_difference(start_time, end_time))
+    end_time = datetime.now()
+    elapsed_time = format_seconds_to_hms((end_time - start_time).total_seconds())
 
     print (f"FastEHC analyzed {processed_data['aggregate_metrics']['COUNT_scans']:,} scans in {elapsed_time} and wrote output files to {output_dir}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())